@@ -1,3 +1,6 @@
+import functools
+
+
 def slice_bits(bs: bytes, ss: list[(int, int)], end: int = -1):
     """Split bytes into list of bits as specified positions
     Args:
@@ -5,72 +8,164 @@ def slice_bits(bs: bytes, ss: list[(int, int)], end: int = -1):
     ss  array of a pair of position and length to slice
     end position to stop process
     """
-    if len(ss) == 0:
-        return []
+    # load whole bytes as one integer, then each field is a shift and a mask
+    total = len(bs) << 3
+    n = int.from_bytes(bs, "big")
 
-    # index of current starting postion
-    s_index = 0
-
-    # clarify total range and first range to process
-    pos = ss[s_index][0]
-    end_pos = len(bs) << 3 if end < 0 else end
-    next_pos = min(end_pos, pos + ss[s_index][1])
-
-    # index of current byte
-    b_index = pos >> 3
+    # clarify total range to process
+    end_pos = total if end < 0 else end
 
     # result of the function
     bits_list = []
-    # extracted bits
-    bits = 0
 
-    while(pos < end_pos):
-        # remaining length to extract
-        rem_len = next_pos - pos
+    for pos, length in ss:
+        if pos >= end_pos:
+            break
+
+        # truncate the range at the end position
+        length = min(end_pos, pos + length) - pos
+
+        bits_list.append((n >> (total - pos - length)) & ((1 << length) - 1))
 
-        while(pos < next_pos):
-            # load byte to process
-            b = bs[b_index]
+    return bits_list
 
-            # clarify range to process in the byte
-            max_pos = (b_index + 1) << 3
-            to_pos = min(pos + rem_len, max_pos)
-            length = to_pos - pos
 
-            # remove unnecessary bits from left side
-            b = b & (0xFF >> (pos % 8))
-            # remove unnecessary bits from right side
-            b = b >> (max_pos - to_pos)
+def make_extractors(ss: list[(int, int)]):
+    """Make extractors to slice bits at specified positions
+    Args:
+    ss  array of a pair of position and length to slice
 
-            # store
-            bits = (bits << length) + b
+    Returns tuple of ss, bytes length needed and (byte offset, width, shift, mask) of each range
+    """
+    size = 0
+    slices = []
 
-            # update remaining length and move cursor
-            rem_len -= length
-            pos += length
+    for pos, length in ss:
+        # range of bytes which contain the bits
+        byte_lo = pos >> 3
+        byte_hi = (pos + length + 7) >> 3
 
-            # continue to next byte
-            if pos >= max_pos:
-                b_index += 1
+        size = max(size, byte_hi)
+        slices.append((byte_lo, byte_hi - byte_lo, (byte_hi << 3) - (pos + length), (1 << length) - 1))
 
-        # push to result
-        bits_list.append(bits)
+    return ss, size, tuple(slices)
 
-        # clear bits
-        bits = 0
 
-        # move onto next range
-        s_index += 1
-        if s_index >= len(ss):
+def fast_extract(bs: bytes, extractors: tuple):
+    """Split bytes into list of bits with extractors
+    Args:
+    bs          array of byte
+    extractors  made by make_extractors
+
+    Returns the same as slice_bits(bs, ss)
+    """
+    ss, size, slices = extractors
+
+    # bytes not long enough to hold all ranges
+    if len(bs) < size:
+        return slice_bits(bs, ss)
+
+    return [int.from_bytes(bs[o:o + w], "big") >> s & m for o, w, s, m in slices]
+
+
+# replace with C implementation if the extension is built
+# $ python3 setup.py build_ext --inplace
+try:
+    from bitsmod import slice_bits
+
+    def fast_extract(bs: bytes, extractors: tuple):
+        return slice_bits(bs, extractors[0])
+except ImportError:
+    pass
+
+
+@functools.cache
+def import_numpy():
+    """Import numpy on first use, so that per-frame analysis does not pay for it
+    Returns module, None if not installed
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+@functools.cache
+def import_slice_bits_nb():
+    """Import compiled version of slice_bits_bulk on first use, as numba takes long to import
+    Returns function, None if numba is not installed
+    """
+    try:
+        from bits_numba import slice_bits_nb
+    except ImportError:
+        return None
+    return slice_bits_nb
+
+
+def slice_bits_bulk(bss: list[bytes], ss: list[(int, int)]):
+    """Split bytes of many frames into columns of bits as specified positions
+    Args:
+    bss array of bytes, all of the same length
+    ss  array of a pair of position and length to slice
+
+    Returns list of columns, each of which holds bits of a range for all frames.
+    Ranges are truncated at the end of bytes in the same way as slice_bits.
+    """
+    if len(bss) == 0:
+        return []
+
+    np = import_numpy()
+    if np is None:
+        # transpose results of slice_bits into columns
+        return [list(col) for col in zip(*(slice_bits(bs, ss) for bs in bss))]
+
+    total = len(bss[0]) << 3
+    arr = np.frombuffer(b"".join(bss), np.uint8).reshape(len(bss), len(bss[0]))
+
+    # truncate ranges at the end position
+    ranges = []
+    for pos, length in ss:
+        if pos >= total:
             break
+        ranges.append((pos, min(total, pos + length) - pos))
 
-        pos = ss[s_index][0]
-        next_pos = min(end_pos, pos + ss[s_index][1])
+    # compiled version processes all frames and ranges in one call
+    slice_bits_nb = import_slice_bits_nb()
+    if slice_bits_nb is not None and all(length <= 64 for _, length in ranges):
+        return slice_bits_nb(arr, np.array(ranges, np.int64).reshape(-1, 2)).T.tolist()
 
-        # index of current byte
-        b_index = pos >> 3
+    # load bytes as big endian 64-bit words, padded with one more word
+    # so that a range crossing a word boundary can always read the next one
+    padded = np.zeros((len(bss), ((total + 63) >> 6 << 3) + 8), np.uint8)
+    padded[:, :arr.shape[1]] = arr
+    words = padded.view(">u8").astype(np.uint64)
 
-    return bits_list
+    # result of the function
+    cols = []
+
+    for pos, length in ranges:
+        # too long to be held by uint64
+        if length > 64:
+            cols.append([slice_bits(bs, [(pos, length)])[0] for bs in bss])
+            continue
+
+        w_index = pos >> 6
+        bit_in_word = pos & 63
+        mask = np.uint64((1 << length) - 1)
+
+        if bit_in_word + length <= 64:
+            # range within a word
+            col = (words[:, w_index] >> np.uint64(64 - bit_in_word - length)) & mask
+        else:
+            # range across two words
+            len_in_next = bit_in_word + length - 64
+            col = ((words[:, w_index] << np.uint64(len_in_next))
+                   | (words[:, w_index + 1] >> np.uint64(64 - len_in_next))) & mask
+
+        cols.append(col.tolist())
+
+    return cols
 
 
 def extract_bits(bs: bytes, s: int, l: int):
@@ -93,12 +188,7 @@ def hexstr_to_bytes(hex_string):
     if len(hex_string) % 2 != 0:
         hex_string = "0" + hex_string
 
-    int_array = []
-
-    for i in range(0, len(hex_string), 2):
-        int_array.append(int(hex_string[i:i+2], 16))
-
-    return bytes(int_array)
+    return bytes.fromhex(hex_string)
 
 
 def extract(hex_string, s, l):
@@ -0,0 +1,45 @@
+import numpy as np
+from numba import njit
+
+
+# mask to remove bits from left side of a byte, index is the number of bits to remove
+LEFT_MASK = (0xFF, 0x7F, 0x3F, 0x1F, 0x0F, 0x07, 0x03, 0x01)
+
+
+@njit(cache=True)
+def slice_bits_nb(arr, ss):
+    """Split bytes of many frames into bits as specified positions
+    Args:
+    arr array of uint8 in shape of (frames, bytes)
+    ss  array of int64 in shape of (ranges, 2), a pair of position and length to slice
+        each range must end within bytes and be 64 bits or less
+
+    Returns array of uint64 in shape of (frames, ranges)
+    """
+    n_frames = arr.shape[0]
+    n_ranges = ss.shape[0]
+    bits_arr = np.zeros((n_frames, n_ranges), np.uint64)
+
+    for f in range(n_frames):
+        for s in range(n_ranges):
+            pos = ss[s, 0]
+            end_pos = pos + ss[s, 1]
+
+            # extracted bits
+            bits = np.uint64(0)
+
+            for b_index in range(pos >> 3, (end_pos + 7) >> 3):
+                # clarify range to process in the byte
+                max_pos = (b_index + 1) << 3
+                from_pos = max(pos, b_index << 3)
+                to_pos = min(end_pos, max_pos)
+
+                # remove unnecessary bits from both sides
+                b = np.uint64(arr[f, b_index] & LEFT_MASK[from_pos & 7]) >> np.uint64(max_pos - to_pos)
+
+                # store
+                bits = (bits << np.uint64(to_pos - from_pos)) | b
+
+            bits_arr[f, s] = bits
+
+    return bits_arr
@@ -0,0 +1,184 @@
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <stdint.h>
+#include <string.h>
+
+/* load 8 bytes from index as big endian, bytes beyond the end are read as 0 */
+static uint64_t
+load_be64(const unsigned char *bs, Py_ssize_t n, Py_ssize_t index)
+{
+    unsigned char buf[8] = {0};
+    uint64_t word;
+
+    if (index + 8 <= n) {
+        memcpy(buf, bs + index, 8);
+    }
+    else if (index < n) {
+        memcpy(buf, bs + index, n - index);
+    }
+
+#if defined(__GNUC__) && PY_LITTLE_ENDIAN
+    memcpy(&word, buf, 8);
+    word = __builtin_bswap64(word);
+#else
+    word = 0;
+    for (int i = 0; i < 8; i++) {
+        word = (word << 8) | buf[i];
+    }
+#endif
+    return word;
+}
+
+/* extract bits in range of 64 bits or less */
+static uint64_t
+extract_word(const unsigned char *bs, Py_ssize_t n, Py_ssize_t pos, Py_ssize_t length)
+{
+    Py_ssize_t b_index = pos >> 3;
+    int offset = (int)(pos & 7);
+    uint64_t word;
+
+    if (length <= 0) {
+        return 0;
+    }
+
+    /* align the first bit of the range to the top of word */
+    word = load_be64(bs, n, b_index) << offset;
+    if (offset + length > 64 && b_index + 8 < n) {
+        word |= bs[b_index + 8] >> (8 - offset);
+    }
+
+    return word >> (64 - length);
+}
+
+/* extract bits in range of any length as int */
+static PyObject *
+extract_long(const unsigned char *bs, Py_ssize_t n, Py_ssize_t pos, Py_ssize_t length)
+{
+    PyObject *bits = PyLong_FromLong(0);
+
+    while (bits != NULL && length > 0) {
+        Py_ssize_t chunk = length < 64 ? length : 64;
+        PyObject *shift, *shifted, *word;
+
+        shift = PyLong_FromSsize_t(chunk);
+        word = PyLong_FromUnsignedLongLong(extract_word(bs, n, pos, chunk));
+        shifted = (shift != NULL) ? PyNumber_Lshift(bits, shift) : NULL;
+        Py_XDECREF(shift);
+        Py_DECREF(bits);
+
+        bits = (shifted != NULL && word != NULL) ? PyNumber_Or(shifted, word) : NULL;
+        Py_XDECREF(shifted);
+        Py_XDECREF(word);
+
+        pos += chunk;
+        length -= chunk;
+    }
+
+    return bits;
+}
+
+PyDoc_STRVAR(slice_bits_doc,
+"slice_bits(bs, ss, end=-1)\n"
+"--\n"
+"\n"
+"Split bytes into list of bits as specified positions\n"
+"Args:\n"
+"bs  array of byte\n"
+"ss  array of a pair of position and length to slice\n"
+"end position to stop process");
+
+static PyObject *
+slice_bits(PyObject *self, PyObject *args)
+{
+    Py_buffer view;
+    PyObject *ss, *seq, *bits_list = NULL;
+    Py_ssize_t end = -1, total, end_pos;
+
+    if (!PyArg_ParseTuple(args, "y*O|n:slice_bits", &view, &ss, &end)) {
+        return NULL;
+    }
+
+    seq = PySequence_Fast(ss, "ss must be a sequence");
+    if (seq == NULL) {
+        goto done;
+    }
+
+    bits_list = PyList_New(0);
+    if (bits_list == NULL) {
+        goto done;
+    }
+
+    /* clarify total range to process */
+    total = view.len << 3;
+    end_pos = end < 0 ? total : end;
+
+    for (Py_ssize_t i = 0; i < PySequence_Fast_GET_SIZE(seq); i++) {
+        Py_ssize_t pos, length;
+        PyObject *pair, *bits;
+
+        /* read a pair of position and length */
+        pair = PySequence_Fast(PySequence_Fast_GET_ITEM(seq, i), "ss must hold pairs of position and length");
+        if (pair == NULL) {
+            Py_CLEAR(bits_list);
+            goto done;
+        }
+        if (PySequence_Fast_GET_SIZE(pair) != 2) {
+            PyErr_SetString(PyExc_ValueError, "ss must hold pairs of position and length");
+            Py_DECREF(pair);
+            Py_CLEAR(bits_list);
+            goto done;
+        }
+        pos = PyLong_AsSsize_t(PySequence_Fast_GET_ITEM(pair, 0));
+        length = PyLong_AsSsize_t(PySequence_Fast_GET_ITEM(pair, 1));
+        Py_DECREF(pair);
+        if (PyErr_Occurred()) {
+            Py_CLEAR(bits_list);
+            goto done;
+        }
+
+        if (pos >= end_pos) {
+            break;
+        }
+
+        /* truncate the range at the end position */
+        length = (end_pos < pos + length ? end_pos : pos + length) - pos;
+
+        if (length <= 64) {
+            bits = PyLong_FromUnsignedLongLong(extract_word(view.buf, view.len, pos, length));
+        }
+        else {
+            bits = extract_long(view.buf, view.len, pos, length);
+        }
+
+        if (bits == NULL || PyList_Append(bits_list, bits) < 0) {
+            Py_XDECREF(bits);
+            Py_CLEAR(bits_list);
+            goto done;
+        }
+        Py_DECREF(bits);
+    }
+
+done:
+    Py_XDECREF(seq);
+    PyBuffer_Release(&view);
+    return bits_list;
+}
+
+static PyMethodDef bitsmod_methods[] = {
+    {"slice_bits", slice_bits, METH_VARARGS, slice_bits_doc},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef bitsmod_module = {
+    PyModuleDef_HEAD_INIT,
+    "bitsmod",
+    "C implementation of bit operations in bits.py",
+    -1,
+    bitsmod_methods
+};
+
+PyMODINIT_FUNC
+PyInit_bitsmod(void)
+{
+    return PyModule_Create(&bitsmod_module);
+}
@@ -2,10 +2,21 @@ import sys
 import argparse
 import re
 import datetime
+import math
 import json
+from collections import namedtuple
 import dbc
 import bits as b
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# decoded field data of a signal
+Field = namedtuple("Field", ["name", "bits", "value", "unit", "desc"])
+
 
 def read_json(file: str):
     """Read JSON file of signal definition
@@ -16,11 +27,34 @@ def read_json(file: str):
         list    signal definition table
     """
     json_list = []
-    with open(file, "r", encoding="utf-8") as fp:
-        json_list = json.load(fp)
+    with open(file, "rb") as fp:
+        data = fp.read()
+
+    # use faster parser if available
+    if orjson is not None:
+        json_list = orjson.loads(data)
+    else:
+        json_list = json.loads(data)
     return json_list
 
 
+def make_layout(values: list):
+    """Make field layout used to decode signal data
+    Args:
+        values  value definitions of a signal
+
+    Returns:
+        tuple   per-field tuple of (name, factor, offset, dec_part, unit, desc)
+        tuple   extractors of bits of each field made by bits.make_extractors
+    """
+    layout = tuple(
+        (v["name"], v["factor"], v["offset"], v.get("dec_part", 0), v["unit"], v["desc"])
+        for v in values)
+    ss = [(v["start"], v["length"]) for v in values]
+
+    return layout, b.make_extractors(ss)
+
+
 def load_stbl(json_list: list):
     """Load signal definition table
     Args:
@@ -42,11 +76,16 @@ def load_stbl(json_list: list):
         if canid in stbl:
             continue
 
+        # intern names to compare them by identity when looking up fields
+        r["name"] = sys.intern(r["name"])
+
         mux = False
         mux_indicator = None
         mux_mode_map = {}
 
         for v in r["values"]:
+            v["name"] = sys.intern(v["name"])
+
             if v["mux_indicator"]:
                 mux = True
                 mux_indicator = v
@@ -63,6 +102,7 @@ def load_stbl(json_list: list):
                 "name": r["name"],
                 "mux_indicator": mux_indicator,
                 "mux_mode_map": mux_mode_map,
+                "mux_layout_map": {k: make_layout(vs) for k, vs in mux_mode_map.items()},
                 "mux": mux,
             }
         else:
@@ -70,6 +110,7 @@ def load_stbl(json_list: list):
                 "id": canid,
                 "name": r["name"],
                 "values": r["values"],
+                "layout": make_layout(r["values"]),
                 "mux": mux,
             }
 
@@ -96,70 +137,106 @@ def analyze_data(bs: bytes, stbl: dict):
         mux_mode = b.extract_bits(bs, mux_ind["start"], mux_ind["length"])
 
         # append mode value to result signal
-        fields.append({
-            "name": mux_ind["name"],
-            "bits": mux_mode,
-            "value": mux_mode,
-            "unit": mux_ind["unit"],
-            "desc": mux_ind["desc"],
-        })
-
-        if mux_mode in stbl["mux_mode_map"]:
-            ds = stbl["mux_mode_map"][mux_mode]
+        fields.append(Field(mux_ind["name"], mux_mode, mux_mode, mux_ind["unit"], mux_ind["desc"]))
+
+        if mux_mode in stbl["mux_layout_map"]:
+            layout, extractors = stbl["mux_layout_map"][mux_mode]
         else:
             # no multiplexer mode matched
             return fields
     else:
-        ds = stbl["values"]
+        layout, extractors = stbl["layout"]
 
     # TODO: consider byte_order
 
-    # read start positions
-    ss = []
-    for d in ds:
-        ss.append((d["start"], d["length"]))
-
     # split bytes into bits by start position and length of each field
-    bits_list = b.slice_bits(bs, ss)
+    bits_list = b.fast_extract(bs, extractors)
+
+    fields.extend(decode_fields(layout, bits_list))
+
+    return fields
+
+
+def analyze_data_bulk(bss: list, stbl: dict):
+    """Analyze bytes of many frames as signal data based on definition
+    Args:
+        bss     array of bytes, all of the same length
+        stbl    table of signal definition
+
+    Returns:
+        list    fields data decoded with stbl for each frame
+    """
+    # initialize result
+    fields_list = [[] for _ in bss]
+
+    # group frames by layout to decode
+    # if multiplexer definition, group frames by mode
+    groups = {}
+    if stbl["mux"]:
+        # identify mode of each frame
+        mux_ind = stbl["mux_indicator"]
+        cols = b.slice_bits_bulk(bss, [(mux_ind["start"], mux_ind["length"])])
+        modes = cols[0] if cols else [None] * len(bss)
+
+        for i, mux_mode in enumerate(modes):
+            # append mode value to result signal
+            fields_list[i].append(Field(mux_ind["name"], mux_mode, mux_mode, mux_ind["unit"], mux_ind["desc"]))
+
+            # skip if no multiplexer mode matched
+            if mux_mode in stbl["mux_layout_map"]:
+                groups.setdefault(mux_mode, []).append(i)
+
+        groups = {k: (stbl["mux_layout_map"][k], idx) for k, idx in groups.items()}
+    else:
+        groups[None] = (stbl["layout"], range(len(bss)))
+
+    for (layout, (ss, _, _)), idx in groups.values():
+        # split bytes of all frames in the group at once
+        cols = b.slice_bits_bulk([bss[i] for i in idx], ss)
+
+        for i, bits_list in zip(idx, zip(*cols) if cols else [()] * len(idx)):
+            fields_list[i].extend(decode_fields(layout, bits_list))
+
+    return fields_list
+
+
+def decode_fields(layout: tuple, bits_list: list):
+    """Convert bits to field data based on layout
+    Args:
+        layout      field layout made by make_layout
+        bits_list   array of bits of each field
+
+    Returns:
+        list    fields data
+    """
+    fields = []
 
     # convert bits to value
-    # possible to length of bits_list is smaller than length of ds
+    # possible to length of bits_list is smaller than length of layout
     # it may occur when Classic signal is processed by FD definition
-    i = 0
-    for bits in bits_list:
-        d = ds[i]
-
-        # TODO(?) transform bits as signed decimal when d["signed"] = True
+    for (name, factor, offset, dec_part, unit, desc), bits in zip(layout, bits_list):
+        # TODO(?) transform bits as signed decimal when signed = True
 
-        value = bits * d["factor"] + d["offset"]
+        value = bits * factor + offset
 
-        dec_part = d.get("dec_part", 0)
         if dec_part:
             value = round(value, dec_part)
 
-        fields.append({
-            "name": d["name"],
-            "bits": bits,
-            "value": value,
-            "unit": d["unit"],
-            "desc": d["desc"],
-        })
-
-        i += 1
-
+        fields.append(Field(name, bits, value, unit, desc))
 
     return fields
 
 
-PAT_CLASSIC = re.compile(r'^\((?P<datetime>[\w.]+)\)\s+(?P<interface>\w+)\s+(?P<id>\w+)#(?P<data>\w+)')
-PAT_FD = re.compile(r'^\((?P<datetime>[\w.]+)\)\s+(?P<interface>\w+)\s+(?P<id>\w+)##\d(?P<data>\w+)')
+# matches both Classic (ID#DATA) and FD (ID##<flags>DATA) frames
+PAT_FRAME = re.compile(r'^\((?P<datetime>[\w.]+)\)\s+(?P<interface>\w+)\s+(?P<id>\w+)(?:##\d|#)(?P<data>\w+)', re.ASCII)
 
 
-def analyze(text, stbl):
+def analyze(text, stbl, decode=True):
     """Analyze CAN signal of CAN frame logfile format
     Args:
         text    signal text
         stbl    table of signal definition
+        decode  decode signal data into fields, fields will be None if False
 
     Returns:
         bool    True if decode with stbl succeeded, False if stbl does not have the definition of the CAN ID
@@ -171,25 +248,104 @@ def analyze(text, stbl):
     signal = {"text": text}
 
     # pattern matching
-    match = PAT_CLASSIC.search(text)
-    if not match:
-        match = PAT_FD.search(text)
+    match = PAT_FRAME.match(text)
 
     if match:
-        timestamp = float(match.group("datetime"))
-        dt = datetime.datetime.fromtimestamp(timestamp)
-        signal["timestamp"] = timestamp
-        signal["dt"] = dt.strftime("%Y-%m-%d %H:%M:%S.%f")
-        signal["if"] = match.group("interface")
-        signal["id"] = int(match.group("id"), 16)
+        read_header(match, signal)
 
         if signal["id"] in stbl:
-            signal["fields"] = analyze_data(b.hexstr_to_bytes(match.group("data")), stbl[signal["id"]])
+            signal["fields"] = None
+            if decode:
+                signal["fields"] = analyze_data(b.hexstr_to_bytes(match.group("data")), stbl[signal["id"]])
             result = True
 
     return result, signal
 
 
+def analyze_bulk(lines, stbl, decode=True):
+    """Analyze CAN signals of CAN frame logfile format at once
+    Frames are grouped by CAN ID and data length then decoded group by group.
+
+    Args:
+        lines   array of signal text
+        stbl    table of signal definition
+        decode  decode signal data into fields, fields will be None if False
+
+    Returns:
+        list    pairs of bool and dict as analyze() returns, in order of lines
+    """
+    signals = []
+
+    # frames to decode, key is a pair of CAN ID and data length
+    groups = {}
+
+    for text in lines:
+        # store the original text
+        signal = {"text": text}
+        signals.append(signal)
+
+        # pattern matching
+        match = PAT_FRAME.match(text)
+
+        if match:
+            read_header(match, signal)
+
+            if signal["id"] in stbl:
+                signal["fields"] = None
+                if decode:
+                    bs = b.hexstr_to_bytes(match.group("data"))
+                    groups.setdefault((signal["id"], len(bs)), []).append((signal, bs))
+
+    for (canid, _), frames in groups.items():
+        fields_list = analyze_data_bulk([bs for _, bs in frames], stbl[canid])
+
+        for (signal, _), fields in zip(frames, fields_list):
+            signal["fields"] = fields
+
+    return [("fields" in signal, signal) for signal in signals]
+
+
+# seconds and its formatted date and time of the last timestamp read
+# consecutive frames mostly share the same second
+dt_cache = (None, "")
+
+
+def format_timestamp(timestamp: float):
+    """Format timestamp as date and time with microseconds
+    Args:
+        timestamp   seconds since the epoch
+
+    Returns:
+        str     formatted as "%Y-%m-%d %H:%M:%S.%f"
+    """
+    global dt_cache
+
+    # split into seconds and microseconds rounded as datetime does
+    sec = math.floor(timestamp)
+    us = round((timestamp - sec) * 1000000)
+    if us >= 1000000:
+        sec += 1
+        us -= 1000000
+
+    if sec != dt_cache[0]:
+        dt_cache = (sec, datetime.datetime.fromtimestamp(sec).strftime("%Y-%m-%d %H:%M:%S"))
+
+    return "%s.%06d" % (dt_cache[1], us)
+
+
+def read_header(match, signal):
+    """Read header part of CAN frame logfile format into signal
+    Args:
+        match   result of PAT_FRAME matching
+        signal  dict to store timestamp, interface and CAN ID
+    """
+    timestamp = float(match.group("datetime"))
+    signal["timestamp"] = timestamp
+    signal["dt"] = format_timestamp(timestamp)
+    signal["if"] = match.group("interface")
+    signal["id"] = int(match.group("id"), 16)
+
+
 def find_field(name, fields):
     """Find a field data by name specified
     Args:
@@ -197,10 +353,10 @@ def find_field(name, fields):
         fields  array of data in signal
 
     Returns:
-        dict    field data, None if not found
+        Field   field data, None if not found
     """
     for f in fields:
-        if name == f["name"]:
+        if name == f.name:
             return f
 
     return None
@@ -213,16 +369,26 @@ def find_fields(names, fields):
         fields  array of data in signal
 
     Returns:
-        dict    fields data, key is name, value is dict of a field data
+        dict    fields data, key is name, value is Field
     """
-    fs = {}
+    index = index_fields(fields)
 
-    for name in names:
-        f = find_field(name, fields)
-        if f:
-            fs[name] = f
+    return {name: index[name] for name in names if name in index}
 
-    return fs
+
+def index_fields(fields):
+    """Index fields data by name
+    Args:
+        fields  array of data in signal
+
+    Returns:
+        dict    fields data, key is name, value is Field, the first one wins as in find_field
+    """
+    index = {}
+    for f in fields:
+        index.setdefault(f.name, f)
+
+    return index
 
 
 def match_fields(patterns, fields):
@@ -232,29 +398,69 @@ def match_fields(patterns, fields):
         fields      array of data in signal
 
     Returns:
-        dict    fields data, key is name, value is dict of a field data
+        dict    fields data, key is name, value is Field
     """
     fs = {}
 
     for f in fields:
-        if any(list(map(lambda p: p.search(f["name"]), patterns))):
-            fs[f["name"]] = f
+        if any(list(map(lambda p: p.search(f.name), patterns))):
+            fs[f.name] = f
 
     return fs
 
 
 def format_name_and_value(delim="="):
-    def wrapper(item: dict):
-        return f"{item['name']}{delim}{item['value']}"
+    def wrapper(item: Field):
+        return f"{item.name}{delim}{item.value}"
     return wrapper
 
 
 def format_name_and_bits(delim="="):
-    def wrapper(item: dict):
-        return "%s%s0x%X" % (item['name'], delim, item['bits'])
+    def wrapper(item: Field):
+        return "%s%s0x%X" % (item.name, delim, item.bits)
     return wrapper
 
 
+def format_with_remark(formatter):
+    def wrapper(item: Field):
+        return "%s (%s)" % (formatter(item), "|".join(filter(None, [item.unit, item.desc])))
+    return wrapper
+
+
+def read_lines(fp, encoding: str, errors: str = "strict", size: int = 1 << 16):
+    """Read lines from binary stream chunk by chunk
+    Lines are split at \\n only and trailing \\r is removed, as text mode stdin does on POSIX.
+    A lone \\r does not end a line, unlike universal newlines on Windows.
+
+    Args:
+        fp          binary stream
+        encoding    encoding of text
+        errors      error handler of decoding, e.g. sys.stdin.errors
+        size        max size in bytes to read at once
+
+    Yields:
+        list    lines available at once, without line endings
+    """
+    rest = b""
+
+    while True:
+        # read what is available without waiting for size bytes
+        chunk = fp.read1(size)
+        if not chunk:
+            break
+
+        # keep an incomplete last line until the next chunk
+        chunk = rest + chunk
+        pos = chunk.rfind(b"\n") + 1
+        rest = chunk[pos:]
+
+        if pos > 0:
+            yield [line.rstrip("\r") for line in chunk[:pos - 1].decode(encoding, errors).split("\n")]
+
+    if rest:
+        yield [rest.decode(encoding, errors).rstrip("\r")]
+
+
 def clear_lines(n):
     for _ in range(n):
         sys.stdout.write("\033[F")   # move cursor to one above
@@ -274,6 +480,9 @@ def main():
     parser.add_argument("fields", nargs="*", help="fields to show values in the signal")
     args = parser.parse_args()
 
+    # intern names to compare them with interned field names by identity
+    args.fields = [sys.intern(f) for f in args.fields]
+
     # CAN signal definition table
     json_list = []
     if args.stbl:
@@ -297,78 +506,91 @@ def main():
     formatter = format_name_and_value(delim)
     if args.bits:
         formatter = format_name_and_bits(delim)
-
-    # process each line in CAN frame logfile format
-    while True:
-        # read a line
-        line = sys.stdin.readline()
-
-        if not line:
-            break
-
-        # analyze text using stbl
-        # res will be True if stbl has a definition of the CAN ID
-        res, signal = analyze(line.rstrip('\r\n'), stbl)
-
-        # print text then go to next if CAN ID is not found in stbl
-        if not res:
-            print(signal["text"])
-            continue
-
-        # identify field data to be detailed in remark
-        if args.regexp:
-            # use regex patterns
-            field_patterns = list(map(lambda f: re.compile(f), args.fields))
-            fields = match_fields(field_patterns, signal["fields"])
-        else:
-            field_names = args.fields
-            if args.all:
-                field_names = list(map(lambda f: f["name"], signal["fields"]))
-            fields = find_fields(field_names, signal["fields"])
-
-        if args.monitor:
-            line_num = len(monitoring_fields.keys())
-            updated = False
-            for k, v in fields.items():
-                if k in monitoring_fields:
-                    if monitoring_fields[k]["bits"] != v["bits"]:
+    if args.verbosity >= 1:
+        formatter = format_with_remark(formatter)
+
+    # options used in the loop below
+    show_all = args.all
+    monitor = args.monitor
+    regexp = args.regexp
+    requested = args.fields
+    dump = args.verbosity >= 3
+
+    # regex patterns of fields to show
+    field_patterns = []
+    if regexp:
+        field_patterns = list(map(lambda f: re.compile(f), requested))
+
+    # decode signal data only if any field will be shown
+    decode = show_all or len(requested) > 0 or dump
+
+    # write through stdout's own buffer instead of print() per line
+    # stdout is block-buffered when piped and line-buffered on a terminal
+    out = sys.stdout
+    write = out.write
+
+    # process lines in CAN frame logfile format
+    # read lines available at once together
+    for lines in read_lines(sys.stdin.buffer, sys.stdin.encoding, sys.stdin.errors):
+        for line in lines:
+            # analyze text using stbl
+            # res will be True if stbl has a definition of the CAN ID
+            res, signal = analyze(line, stbl, decode)
+
+            # print text then go to next if CAN ID is not found in stbl
+            if not res:
+                write(signal["text"] + "\n")
+                continue
+
+            # no field to show, monitor shows nothing and others print text only
+            if signal["fields"] is None:
+                if not monitor:
+                    write(signal["text"] + "\n")
+                continue
+
+            # identify field data to be detailed in remark
+            if regexp:
+                # use regex patterns
+                fields = match_fields(field_patterns, signal["fields"])
+            else:
+                if show_all:
+                    # all fields in order, no need to look them up by name
+                    fields = index_fields(signal["fields"])
+                else:
+                    fields = find_fields(requested, signal["fields"])
+
+            if monitor:
+                line_num = len(monitoring_fields.keys())
+                updated = False
+                for k, v in fields.items():
+                    if k in monitoring_fields:
+                        if monitoring_fields[k].bits != v.bits:
+                            monitoring_fields[k] = v
+                            updated = True
+                    else:
                         monitoring_fields[k] = v
                         updated = True
-                else:
-                    monitoring_fields[k] = v
-                    updated = True
-
-            if updated:
-                # generate remark text
-                remark_items = map(formatter, monitoring_fields.values())
-                if args.verbosity >= 1:
-                    remark_items = map(
-                        lambda x, item: "%s (%s)" % (x, "|".join(filter(lambda x: x, [item['unit'], item['desc']]))),
-                        remark_items,
-                        monitoring_fields.values())
-
-                # print text
-                clear_lines(line_num)
-                print("\n".join(remark_items))
 
-        else:
-            # generate remark text
-            remark_items = list(map(formatter, fields.values()))
-            if args.verbosity >= 1:
-                remark_items = list(map(
-                    lambda x, item: "%s (%s)" % (x, "|".join(filter(lambda x: x, [item['unit'], item['desc']]))),
-                    remark_items,
-                    fields.values()))
-
-            # print text according to verbosity level
-            if args.verbosity >= 3:
-                print(signal)
+                if updated:
+                    # generate remark text
+                    remark_items = [formatter(f) for f in monitoring_fields.values()]
+
+                    # print text
+                    clear_lines(line_num)
+                    write("\n".join(remark_items) + "\n")
+                    out.flush()
+
             else:
-                ex = "\t".join(remark_items)
-                if len(ex) > 0:
-                    print("%s\t%s" % (signal["text"], ex))
+                # print text according to verbosity level
+                if dump:
+                    write("%s\n" % signal)
                 else:
-                    print(signal["text"])
+                    # generate remark text
+                    ex = "\t".join([formatter(f) for f in fields.values()])
+                    if len(ex) > 0:
+                        write("%s\t%s\n" % (signal["text"], ex))
+                    else:
+                        write(signal["text"] + "\n")
 
     return 0
 
@@ -0,0 +1,11 @@
+import sys
+from setuptools import setup, Extension
+
+# build C implementation of bits.py in place
+# $ python3 setup.py build_ext --inplace
+setup(
+    name="canaly",
+    ext_modules=[
+        Extension("bitsmod", ["bitsmod.c"], extra_compile_args=[] if sys.platform == "win32" else ["-O3"]),
+    ],
+)